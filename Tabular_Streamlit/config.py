@@ -4,6 +4,31 @@ Column definitions and constants for the Tabular Streamlit app.
 
 import streamlit as st
 
+# ── Page styling ─────────────────────────────────────────────────────────────
+
+# Injected on every run: Streamlit drops elements a rerun does not re-create,
+# so this cannot be limited to the first run of a session.
+APP_CSS = """
+    <style>
+    .main-header {font-size: 2rem; font-weight: 700; color: #1E3A5F; margin-bottom: 0.5rem;}
+    .sub-header  {font-size: 1.2rem; font-weight: 600; color: #2E4A6F;}
+    div[data-testid="stDataEditor"] {border: 1px solid #ddd; border-radius: 8px;}
+    /* Make data editor column headers bold and black */
+    div[data-testid="stDataEditor"] [data-testid="glide-data-grid-canvas"] {
+        --gdg-text-header: #000000 !important;
+        --gdg-text-header-selected: #000000 !important;
+    }
+    </style>
+"""
+
+# ── Snowflake session settings ───────────────────────────────────────────────
+# Sent with the login request rather than as ALTER SESSION statements - add new
+# settings here to avoid extra round-trips.
+
+SESSION_PARAMETERS = {
+    "QUERY_TAG": "streamlit-client-app-tabular",  # identifies this app's queries
+}
+
 # ── Qualification levels (shared by Sensitivities and Blockers) ──────────────
 
 QUALIFICATION_OPTIONS = ["None", "Low", "Medium", "High", "Dealbreaker"]
@@ -32,7 +57,18 @@ BLOCKER_TYPES = [
     "Execution speed",
 ]
 
+# ── Query to fetch broker / clearer dropdown names ───────────────────────────
+# One DISTINCT per column (via UNION) so each name is shipped once,
+# tagged by KIND: B = broker, C = clearer.
+
+FIRM_NAMES_QUERY = """
+    SELECT 'B' AS KIND, BROKER AS NAME FROM ALL_FIRM_NAMES WHERE BROKER IS NOT NULL
+    UNION
+    SELECT 'C', CLEARER FROM ALL_FIRM_NAMES WHERE CLEARER IS NOT NULL
+"""
+
 # ── Query to fetch data from the view ────────────────────────────────────────
+# No ORDER BY: rows are sorted by KEY_COLUMNS in pandas after the fetch.
 
 VIEW_QUERY = """
     SELECT COMPANY, CLIENT_TYPE, CLIENT_STATUS, EEX_KAM, INCUBEX_KAM,
@@ -41,7 +77,6 @@ VIEW_QUERY = """
            ACCESS_TYPE, FRONT_END, FRONT_END_DETAILS, CLEARERS, BROKERS,
            ETRM, SOURCE, NOTES, ENTRY_DATE, FIELD_UPDATE_DATES
     FROM STREAMLIT_APP_VIEW2
-    ORDER BY COMPANY, CLIENT_TYPE
 """
 
 VIEW_COLUMNS = [
@@ -142,6 +177,20 @@ INSERT_QUERY = """
 """
 
 
+# ── Dropdown options ─────────────────────────────────────────────────────────
+
+STATUS_OPTIONS = ("Client", "Prospect", "Setting up")
+ACCESS_TYPE_OPTIONS = ("NCM", "GCM", "DMA", "API", "Sponsored Access", "Voice", "Other")
+ETRM_OPTIONS = (
+    "Allegro", "Amphora", "Aspect",
+    "Brady (Igloo, Powerdesk, Crisk...)",
+    "Comcore", "Eka", "Endure", "Entrade", "Entrader", "Ignite",
+    "Inatech", "Lancelot", "Molecule", "Openlink", "PCI", "PexaOS",
+    "Triplepoint", "Vuepoint",
+)
+SOURCE_OPTIONS = ("Meeting", "Estimate", "Call")
+
+
 # ── Data editor column config ────────────────────────────────────────────────
 
 def get_column_config(broker_options=None, clearer_options=None):
@@ -166,7 +215,7 @@ def get_column_config(broker_options=None, clearer_options=None):
         "ENTRY_DATE": st.column_config.DateColumn("Entry Date", width=110),
         "CLIENT_STATUS": st.column_config.SelectboxColumn(
             "Status",
-            options=["Client", "Prospect", "Setting up"],
+            options=STATUS_OPTIONS,
             required=False,
             width=75,
         ),
@@ -180,7 +229,7 @@ def get_column_config(broker_options=None, clearer_options=None):
         "OTHER_PRODUCT_NOTES": st.column_config.TextColumn("Other Products", width=150),
         "ACCESS_TYPE": st.column_config.SelectboxColumn(
             "Access Type",
-            options=["NCM", "GCM", "DMA", "API", "Sponsored Access", "Voice", "Other"],
+            options=ACCESS_TYPE_OPTIONS,
             required=False,
             width=105,
         ),
@@ -200,19 +249,13 @@ def get_column_config(broker_options=None, clearer_options=None):
         ),
         "ETRM": st.column_config.SelectboxColumn(
             "ETRM",
-            options=[
-                "Allegro", "Amphora", "Aspect",
-                "Brady (Igloo, Powerdesk, Crisk...)",
-                "Comcore", "Eka", "Endure", "Entrade", "Entrader", "Ignite",
-                "Inatech", "Lancelot", "Molecule", "Openlink", "PCI", "PexaOS",
-                "Triplepoint", "Vuepoint",
-            ],
+            options=ETRM_OPTIONS,
             required=False,
             width=130,
         ),
         "SOURCE": st.column_config.SelectboxColumn(
             "Source",
-            options=["Meeting", "Estimate", "Call"],
+            options=SOURCE_OPTIONS,
             required=False,
             width=100,
         ),
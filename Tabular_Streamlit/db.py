@@ -6,35 +6,72 @@ import json
 import time
 
 import pandas as pd
+import pyarrow.compute as pc
 import snowflake.connector
 import streamlit as st
 
-from config import VIEW_QUERY, VIEW_COLUMNS, INSERT_QUERY, VALUE_TO_QUALIFICATION
+from config import (
+    SESSION_PARAMETERS, FIRM_NAMES_QUERY, VIEW_QUERY, VIEW_COLUMNS, KEY_COLUMNS, INSERT_QUERY, VALUE_TO_QUALIFICATION,
+)
 
 
-def get_snowflake_connection(schema="CLIENTS", max_retries=3):
+def _is_connection_alive(conn) -> bool:
+    """Run a trivial query to check that a cached connection is still usable."""
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+@st.cache_resource(ttl=3600)
+def _open_snowflake_connection(max_retries=3):
     """
-    Create Snowflake connection using Streamlit secrets with retry logic.
+    Open a Snowflake connection using Streamlit secrets with retry logic.
+    Cached so a single live connection is shared across reruns and sessions.
     """
     last_error = None
     for attempt in range(max_retries):
         try:
-            conn = snowflake.connector.connect(
+            return snowflake.connector.connect(
                 user=st.secrets["snowflake"]["user"],
                 password=st.secrets["snowflake"]["password"],
                 account=st.secrets["snowflake"]["account"],
                 warehouse=st.secrets["snowflake"]["warehouse"],
                 database="INCUBEX_DATA_LAKE",
-                schema=schema,
+                schema="CLIENTS",
+                session_parameters=SESSION_PARAMETERS,
+                # INSERT_QUERY and the KAM MERGE bind %(name)s markers client-side;
+                # pin the style per connection so a process-wide change cannot break them
+                paramstyle="pyformat",
             )
-            return conn
         except Exception as e:
             last_error = e
             if attempt < max_retries - 1:
                 time.sleep(1)
 
-    st.error(f"Connection error after {max_retries} attempts: {str(last_error)}")
-    return None
+    # Raise rather than return None so a failed attempt is never cached
+    raise last_error
+
+
+def get_snowflake_connection(max_retries=3):
+    """
+    Return the shared Snowflake connection, reconnecting if it has gone stale.
+    Callers should close their cursors but never the connection itself.
+    """
+    try:
+        conn = _open_snowflake_connection(max_retries)
+        if not _is_connection_alive(conn):
+            _open_snowflake_connection.clear()
+            conn = _open_snowflake_connection(max_retries)
+        return conn
+    except Exception as e:
+        st.error(f"Connection error after {max_retries} attempts: {str(e)}")
+        return None
 
 
 def _parse_json_column(value) -> dict:
@@ -71,36 +108,42 @@ def _json_to_display(raw: dict) -> str:
     return ", ".join(parts)
 
 
-@st.cache_data(ttl=3600)
-def fetch_firm_names() -> tuple[list[str], list[str]]:
+# An all-empty result (failed fetch) fails validation and is refetched on the
+# next call rather than served for the full hour.
+@st.cache_resource(ttl=3600, max_entries=1, validate=lambda names: any(names))
+def fetch_firm_names() -> tuple[tuple[str, ...], tuple[str, ...]]:
     """
     Fetch distinct broker and clearer names from ALL_FIRM_NAMES.
-    Returns (brokers, clearers) as sorted lists.
+    Returns (brokers, clearers) as sorted tuples.
+
+    Cached as a shared resource (one object for all sessions, no per-call
+    copy) - do not mutate the result.
     """
-    conn = get_snowflake_connection(schema="CLIENTS")
+    conn = get_snowflake_connection()
     if conn is None:
-        return [], []
+        return (), ()
 
     brokers = []
     clearers = []
+    cursor = None
     try:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT DISTINCT BROKER, CLEARER
-            FROM ALL_FIRM_NAMES
-            WHERE BROKER IS NOT NULL OR CLEARER IS NOT NULL
-        """)
-        for row in cursor.fetchall():
-            if row[0]:
-                brokers.append(row[0])
-            if row[1]:
-                clearers.append(row[1])
+        cursor.execute(FIRM_NAMES_QUERY)
+        # Stay in Arrow: filter by KIND column-wise and only convert the names to Python
+        table = cursor.fetch_arrow_all()
+        if table is not None:  # fetch_arrow_all returns None for an empty result
+            brokers = table.filter(pc.equal(table["KIND"], "B"))["NAME"].to_pylist()
+            clearers = table.filter(pc.equal(table["KIND"], "C"))["NAME"].to_pylist()
     except Exception as e:
         st.error(f"Error fetching firm names: {str(e)}")
     finally:
-        conn.close()
+        if cursor:
+            cursor.close()
 
-    return sorted(set(brokers)), sorted(set(clearers))
+    return (
+        tuple(sorted(set(b for b in brokers if b))),
+        tuple(sorted(set(c for c in clearers if c))),
+    )
 
 
 @st.cache_data(ttl=600)
@@ -113,15 +156,21 @@ def fetch_view_data() -> pd.DataFrame:
     if conn is None:
         return pd.DataFrame(columns=VIEW_COLUMNS)
 
+    cursor = None
     try:
         cursor = conn.cursor()
         cursor.execute(VIEW_QUERY)
-        df = pd.DataFrame(cursor.fetchall(), columns=VIEW_COLUMNS)
+        # Arrow-backed fetch builds the DataFrame straight from columnar batches
+        df = cursor.fetch_pandas_all()
+        # Sort client-side rather than adding a sort operator to the query plan.
+        # ignore_index keeps row labels positional, which the editor panels rely on.
+        df = df.sort_values(KEY_COLUMNS, ignore_index=True)
     except Exception as e:
         st.error(f"Error fetching data: {str(e)}")
         return pd.DataFrame(columns=VIEW_COLUMNS)
     finally:
-        conn.close()
+        if cursor:
+            cursor.close()
 
     # Parse JSON columns into raw dicts (for edit panel pre-population)
     df["_SENSITIVITIES_RAW"] = df["SENSITIVITIES"].apply(_parse_json_column)
@@ -134,9 +183,10 @@ def fetch_view_data() -> pd.DataFrame:
     df["SENSITIVITIES"] = df["_SENSITIVITIES_RAW"].apply(_json_to_display)
     df["BARRIERS"] = df["_BARRIERS_RAW"].apply(_json_to_display)
 
-    # Coerce volume columns to numeric
+    # Coerce volume columns to numeric. Arrow may hand back a narrow integer
+    # dtype (e.g. int16), so widen to float64 to hold any value edited inline.
     for col in ("EUA_VOLUME", "GO_VOLUME"):
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
 
     return df
 
@@ -162,6 +212,7 @@ def upsert_prospect_kam(kam_rows: list[dict]) -> tuple[int, list[str]]:
 
     errors = []
     success_count = 0
+    cursor = None
     try:
         cursor = conn.cursor()
         for row in kam_rows:
@@ -188,7 +239,8 @@ def upsert_prospect_kam(kam_rows: list[dict]) -> tuple[int, list[str]]:
         errors.append(f"KAM upsert failed: {e}")
         return success_count, errors
     finally:
-        conn.close()
+        if cursor:
+            cursor.close()
 
 
 def insert_changed_rows(rows: list[dict]) -> tuple[int, list[str]]:
@@ -216,6 +268,7 @@ def insert_changed_rows(rows: list[dict]) -> tuple[int, list[str]]:
 
     errors = []
     success_count = 0
+    cursor = None
     try:
         cursor = conn.cursor()
         for row in rows:
@@ -230,4 +283,5 @@ def insert_changed_rows(rows: list[dict]) -> tuple[int, list[str]]:
         errors.append(f"Insert failed: {e}")
         return success_count, errors
     finally:
-        conn.close()
+        if cursor:
+            cursor.close()
@@ -15,6 +15,7 @@ import pandas as pd
 import streamlit as st
 
 from config import (
+    APP_CSS,
     EDITABLE_COLUMNS,
     READ_ONLY_COLUMNS,
     KAM_COLUMNS,
@@ -33,21 +34,7 @@ from db import fetch_view_data, fetch_firm_names, insert_changed_rows, upsert_pr
 
 st.set_page_config(page_title="Client Data - Tabular View", page_icon="📋", layout="wide")
 
-st.markdown(
-    """
-    <style>
-    .main-header {font-size: 2rem; font-weight: 700; color: #1E3A5F; margin-bottom: 0.5rem;}
-    .sub-header  {font-size: 1.2rem; font-weight: 600; color: #2E4A6F;}
-    div[data-testid="stDataEditor"] {border: 1px solid #ddd; border-radius: 8px;}
-    /* Make data editor column headers bold and black */
-    div[data-testid="stDataEditor"] [data-testid="glide-data-grid-canvas"] {
-        --gdg-text-header: #000000 !important;
-        --gdg-text-header-selected: #000000 !important;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+st.markdown(APP_CSS, unsafe_allow_html=True)
 
 st.markdown('<p class="main-header">📋 Client Data - Tabular View</p>', unsafe_allow_html=True)
 
@@ -925,6 +912,7 @@ with col_right:
 
 if refresh_clicked:
     fetch_view_data.clear()
+    fetch_firm_names.clear()
     st.session_state.force_reload = True
     st.rerun()
 
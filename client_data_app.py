@@ -7,7 +7,9 @@ import streamlit as st
 import snowflake.connector
 from datetime import date, datetime
 import pandas as pd
+import pyarrow.compute as pc
 import json
+import threading
 
 # Impact level mappings: label <-> numeric value
 IMPACT_LABEL_TO_VALUE = {
@@ -20,6 +22,110 @@ IMPACT_LABEL_TO_VALUE = {
 IMPACT_VALUE_TO_LABEL = {v: k for k, v in reversed(list(IMPACT_LABEL_TO_VALUE.items()))}
 IMPACT_OPTIONS = list(IMPACT_LABEL_TO_VALUE.keys())
 
+# Form option lists (tuples, built once per process rather than on every rerun)
+CLIENT_TYPE_OPTIONS = ("Customer", "Clearer", "Broker")
+STATUS_OPTIONS = ("Client", "Prospect", "Setting up")
+SENSITIVITY_OPTIONS = ("Margin", "Fees", "Liquidity", "Settlement")
+BARRIER_OPTIONS = (
+    "Habit (e.g. ICE Default)",
+    "Systems Setup (EEX)",
+    "Systems Setup (Client or External)",
+    "Compliance",
+    "Risk",
+    "Onboarding/KYC",
+    "Execution speed",
+)
+EUA_VOLUME_RANGES = (None, "<2.5k", "2.5-5k", "5-10k", "10-20k", "20-50k", "50k+")
+GO_VOLUME_RANGES = (None, "<2.5k", "2.5-5k", "5-10k", "10-20k", "20k+")
+ACCESS_TYPE_OPTIONS = ("NCM", "GCM", "DMA", "API", "Sponsored Access", "Voice", "Other")
+ETRM_OPTIONS = (
+    "Allegro",
+    "Amphora",
+    "Aspect",
+    "Brady (Igloo, Powerdesk, Crisk...)",
+    "Comcore",
+    "Eka",
+    "Endure",
+    "Entrade",
+    "Entrader",
+    "Ignite",
+    "Inatech",
+    "Lancelot",
+    "Molecule",
+    "Openlink",
+    "PCI",
+    "PexaOS",
+    "Triplepoint",
+    "Vuepoint",
+)
+FRONT_END_OPTIONS = ("TT", "Trayport", "Touchpoint", "Manual Entry", "CQG")
+SOURCE_OPTIONS = ("Meeting", "Estimate", "Call")
+
+# Snowflake session settings, sent with the login request rather than as
+# ALTER SESSION statements - add new settings here to avoid extra round-trips.
+SESSION_PARAMETERS = {
+    "QUERY_TAG": "streamlit-client-app",  # identifies this app's queries in query history
+}
+
+# Dropdown/view queries, kept as module constants so every execution sends
+# byte-identical SQL (eligible for Snowflake's result cache).
+# FIRM_NAMES_QUERY returns one DISTINCT per column (via UNION), tagged by
+# KIND: B = broker, C = clearer, K = customer.
+FIRM_NAMES_QUERY = """
+    SELECT 'B' AS KIND, BROKER AS NAME FROM ALL_FIRM_NAMES WHERE BROKER IS NOT NULL
+    UNION
+    SELECT 'C', CLEARER FROM ALL_FIRM_NAMES WHERE CLEARER IS NOT NULL
+    UNION
+    SELECT 'K', CUSTOMER FROM ALL_FIRM_NAMES WHERE CUSTOMER IS NOT NULL
+"""
+
+CLIENTS_QUERY = """
+    SELECT COMPANY, CLIENT_TYPE, CLIENT_STATUS, SENSITIVITIES, BARRIERS,
+           DECISION_MAKERS, EUA_VOLUME, GO_VOLUME, OTHER_PRODUCT_NOTES,
+           ACCESS_TYPE, FRONT_END, FRONT_END_DETAILS, CLEARERS, BROKERS,
+           ETRM, SOURCE, NOTES
+    FROM STREAMLIT_APP_VIEW
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY COMPANY, CLIENT_TYPE ORDER BY ENTRY_DATE DESC) = 1
+"""
+
+RECENT_QUERY = """
+    SELECT ENTRY_DATE, COMPANY, CLIENT_TYPE, CLIENT_STATUS, SENSITIVITIES, BARRIERS,
+           DECISION_MAKERS, EUA_VOLUME, GO_VOLUME, OTHER_PRODUCT_NOTES,
+           ACCESS_TYPE, FRONT_END, FRONT_END_DETAILS, CLEARERS, BROKERS,
+           ETRM, SOURCE, NOTES
+    FROM STREAMLIT_APP_VIEW
+    ORDER BY ENTRY_DATE DESC
+    LIMIT 5
+"""
+
+# Multi-row INSERT ... SELECT (needed for PARSE_JSON on the VARIANT columns).
+# This form is incompatible with executemany(), so insert_client_data joins one
+# INSERT_ROW_SELECT per row with UNION ALL and binds the values positionally in
+# INSERT_FIELDS order. The %s markers are pyformat, bound client-side: they rely on
+# the paramstyle="pyformat" pinned in _open_snowflake_connection (qmark would send
+# them to the server verbatim).
+INSERT_QUERY = """
+    INSERT INTO CLIENTS (
+        CLIENT_STATUS, CLIENT_TYPE, COMPANY, SENSITIVITIES, BARRIERS,
+        DECISION_MAKERS, OVERALL_VOLUME, EUA_VOLUME, GO_VOLUME,
+        POWER_VOLUME, GAS_VOLUME, OTHER_PRODUCT_NOTES, ACCESS_TYPE,
+        FRONT_END, FRONT_END_DETAILS, CLEARERS, BROKERS, ETRM, SOURCE, NOTES
+    )
+"""
+INSERT_ROW_SELECT = """
+    SELECT
+        %s, %s, %s, PARSE_JSON(%s), PARSE_JSON(%s),
+        %s, %s, %s, %s,
+        %s, %s, %s, %s,
+        %s, %s, %s, %s, %s, %s, %s
+"""
+INSERT_FIELDS = (
+    'client_status', 'client_type', 'company', 'sensitivities', 'barriers',
+    'decision_makers', 'overall_volume', 'eua_volume', 'go_volume',
+    'power_volume', 'gas_volume', 'other_product_notes', 'access_type',
+    'front_end', 'front_end_details', 'clearers', 'brokers', 'etrm', 'source', 'notes',
+)
+
 # Page configuration
 st.set_page_config(
     page_title="Client Data Entry",
@@ -28,7 +134,7 @@ st.set_page_config(
 )
 
 # Custom CSS for better styling
-st.markdown("""
+_CSS = """
     <style>
     .main-header {
         font-size: 3rem;
@@ -85,12 +191,30 @@ st.markdown("""
         background-color: #fff5f5 !important;
     }
     </style>
-""", unsafe_allow_html=True)
+"""
+# Emitted on every run: Streamlit drops elements a rerun does not re-create,
+# so injecting this only once per session would lose the styling after the first rerun.
+st.markdown(_CSS, unsafe_allow_html=True)
 
 
-def get_snowflake_connection(schema="CLIENTS", max_retries=3):
+def _is_connection_alive(conn) -> bool:
+    """Run a trivial query to check that a cached connection is still usable."""
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+@st.cache_resource(ttl=3600)
+def _open_snowflake_connection(max_retries=3):
     """
-    Create Snowflake connection using Streamlit secrets with retry logic.
+    Open a Snowflake connection using Streamlit secrets with retry logic.
+    Cached so a single live connection is shared across reruns and sessions.
     For Streamlit Cloud deployment, secrets are stored in .streamlit/secrets.toml
     """
     import time
@@ -98,105 +222,169 @@ def get_snowflake_connection(schema="CLIENTS", max_retries=3):
     last_error = None
     for attempt in range(max_retries):
         try:
-            conn = snowflake.connector.connect(
+            return snowflake.connector.connect(
                 user=st.secrets["snowflake"]["user"],
                 password=st.secrets["snowflake"]["password"],
                 account=st.secrets["snowflake"]["account"],
                 warehouse=st.secrets["snowflake"]["warehouse"],
                 database="INCUBEX_DATA_LAKE",
-                schema=schema
+                schema="CLIENTS",
+                session_parameters=SESSION_PARAMETERS,
+                # Queries bind pyformat (%s) markers client-side; pin the style per connection
+                # so a process-wide change (st.connection sets "qmark") cannot break it
+                paramstyle="pyformat",
             )
-            return conn
         except Exception as e:
             last_error = e
             if attempt < max_retries - 1:
                 time.sleep(1)  # Wait 1 second before retrying
 
-    st.error(f"Connection error after {max_retries} attempts: {str(last_error)}")
-    return None
+    # Raise rather than return None so a failed attempt is never cached
+    raise last_error
 
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def get_all_data():
+def get_snowflake_connection(max_retries=3):
     """
-    Fetch all dropdown lists and client data using a single connection.
-    Returns a tuple of (companies, brokers, clearers, clients_df, recent_df).
+    Return the shared Snowflake connection, reconnecting if it has gone stale.
+    Callers should close their cursors but never the connection itself.
     """
-    companies = []
-    brokers = []
-    clearers = []
-    clients_df = pd.DataFrame()
-    recent_df = pd.DataFrame()
+    try:
+        conn = _open_snowflake_connection(max_retries)
+        if not _is_connection_alive(conn):
+            _open_snowflake_connection.clear()
+            conn = _open_snowflake_connection(max_retries)
+        return conn
+    except Exception as e:
+        st.error(f"Connection error after {max_retries} attempts: {str(e)}")
+        return None
+
+
+# Firm names change rarely - cache for 1 hour. An all-empty result (failed fetch)
+# fails validation, so the next rerun refetches instead of serving it for the hour.
+@st.cache_resource(ttl=3600, max_entries=1, validate=lambda names: any(names))
+def get_firm_names():
+    """
+    Fetch the broker, clearer and company dropdown lists from ALL_FIRM_NAMES.
+    Returns [brokers, clearers, companies], each a sorted tuple of names.
+    Cached as a shared resource (one object for all sessions, no per-call copy) -
+    do not mutate the result except through add_firm_names.
+    """
+    brokers = ()
+    clearers = ()
+    companies = ()
 
     conn = get_snowflake_connection()
     if conn is None:
-        return companies, brokers, clearers, clients_df, recent_df
+        return [brokers, clearers, companies]
 
     cursor = None
     try:
         cursor = conn.cursor()
 
         # Fetch all firm names (brokers, clearers, customers) in a single query
-        cursor.execute("""
-            SELECT DISTINCT BROKER, CLEARER, CUSTOMER
-            FROM ALL_FIRM_NAMES
-            WHERE BROKER IS NOT NULL OR CLEARER IS NOT NULL OR CUSTOMER IS NOT NULL
-            ORDER BY BROKER, CLEARER, CUSTOMER
-        """)
-        for row in cursor.fetchall():
-            if row[0]:  # BROKER column
-                brokers.append(row[0])
-            if row[1]:  # CLEARER column
-                clearers.append(row[1])
-            if row[2]:  # CUSTOMER column
-                companies.append(row[2])
-
-        # Fetch all client data from STREAMLIT_APP_VIEW view
-        cursor.execute("""
-            SELECT COMPANY, CLIENT_TYPE, CLIENT_STATUS, SENSITIVITIES, BARRIERS,
-                   DECISION_MAKERS, EUA_VOLUME, GO_VOLUME, OTHER_PRODUCT_NOTES,
-                   ACCESS_TYPE, FRONT_END, FRONT_END_DETAILS, CLEARERS, BROKERS,
-                   ETRM, SOURCE, NOTES
-            FROM STREAMLIT_APP_VIEW
-        """)
-        columns = ['COMPANY', 'CLIENT_TYPE', 'CLIENT_STATUS', 'SENSITIVITIES', 'BARRIERS',
-                   'DECISION_MAKERS', 'EUA_VOLUME', 'GO_VOLUME', 'OTHER_PRODUCT_NOTES',
-                   'ACCESS_TYPE', 'FRONT_END', 'FRONT_END_DETAILS', 'CLEARERS', 'BROKERS',
-                   'ETRM', 'SOURCE', 'NOTES']
-        clients_df = pd.DataFrame(cursor.fetchall(), columns=columns)
-
-        # Fetch 5 most recent records for display
-        cursor.execute("""
-            SELECT ENTRY_DATE, COMPANY, CLIENT_TYPE, CLIENT_STATUS, SENSITIVITIES, BARRIERS,
-                   DECISION_MAKERS, EUA_VOLUME, GO_VOLUME, OTHER_PRODUCT_NOTES,
-                   ACCESS_TYPE, FRONT_END, FRONT_END_DETAILS, CLEARERS, BROKERS,
-                   ETRM, SOURCE, NOTES
-            FROM STREAMLIT_APP_VIEW
-            ORDER BY ENTRY_DATE DESC
-            LIMIT 5
-        """)
-        recent_columns = ['ENTRY_DATE', 'COMPANY', 'CLIENT_TYPE', 'CLIENT_STATUS', 'SENSITIVITIES', 'BARRIERS',
-                          'DECISION_MAKERS', 'EUA_VOLUME', 'GO_VOLUME', 'OTHER_PRODUCT_NOTES',
-                          'ACCESS_TYPE', 'FRONT_END', 'FRONT_END_DETAILS', 'CLEARERS', 'BROKERS',
-                          'ETRM', 'SOURCE', 'NOTES']
-        recent_df = pd.DataFrame(cursor.fetchall(), columns=recent_columns)
+        cursor.execute(FIRM_NAMES_QUERY)
+        # Stay in Arrow: filter by KIND column-wise and only convert the names to Python
+        table = cursor.fetch_arrow_all()
+
+        if table is not None:  # fetch_arrow_all returns None for an empty result
+            def _names(kind: str) -> tuple:
+                names = table.filter(pc.equal(table['KIND'], kind))['NAME'].to_pylist()
+                return tuple(sorted(name for name in names if name))
+
+            brokers = _names('B')
+            clearers = _names('C')
+            companies = _names('K')
 
     except Exception as e:
-        st.error(f"Error fetching data: {str(e)}")
+        st.error(f"Error fetching firm names: {str(e)}")
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
 
-    return companies, brokers, clearers, clients_df, recent_df
+    return [brokers, clearers, companies]
 
 
-def parse_comma_string(value: str) -> list:
-    """Parse a comma-separated string into a list of stripped values."""
-    if not value or pd.isna(value):
-        return []
-    return [item.strip() for item in str(value).split(",") if item.strip()]
+_FIRM_NAMES_LOCK = threading.Lock()
+
+
+def add_firm_names(brokers=(), clearers=(), companies=()):
+    """
+    Merge newly submitted names into the cached dropdown lists, so they show up
+    without refetching ALL_FIRM_NAMES. Copy-on-write: each affected tuple is
+    replaced, never modified, so lists already handed out stay unchanged.
+    """
+    firm_names = get_firm_names()
+    # The list is shared by every session; serialise the read-modify-write so
+    # concurrent submits cannot drop each other's new names
+    with _FIRM_NAMES_LOCK:
+        for position, new_names in enumerate((brokers, clearers, companies)):
+            missing = set(new_names) - set(firm_names[position])
+            if missing:
+                firm_names[position] = tuple(sorted(set(firm_names[position]) | missing))
+
+
+@st.cache_data(ttl=300)  # Cache for 5 minutes
+def get_clients_df() -> pd.DataFrame:
+    """
+    Fetch client data from STREAMLIT_APP_VIEW (used for form prefill).
+    Only the latest row per (company, client_type) is returned - that is all prefill uses.
+    """
+    clients_df = pd.DataFrame()
+
+    conn = get_snowflake_connection()
+    if conn is None:
+        return clients_df
+
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(CLIENTS_QUERY)
+        # Arrow-backed fetch builds the DataFrame straight from columnar batches
+        clients_df = cursor.fetch_pandas_all()
+        # Version token for caches derived from this DataFrame (see get_prefill_data)
+        clients_df.attrs['fetched_at'] = datetime.now()
+
+        # Split the comma-separated list columns once per fetch instead of on every prefill
+        # (stored sorted, so has_changed comparisons start from ordered lists)
+        for col in ('FRONT_END', 'CLEARERS', 'BROKERS'):
+            clients_df[col] = (
+                clients_df[col].fillna("").astype(str).str.split(",")
+                .map(lambda items: sorted(item.strip() for item in items if item.strip()))
+            )
+
+    except Exception as e:
+        st.error(f"Error fetching client data: {str(e)}")
+    finally:
+        if cursor:
+            cursor.close()
+
+    return clients_df
+
+
+@st.cache_data(ttl=60, max_entries=1)  # Recent records change on every submit - cache for 1 minute
+def get_recent_df() -> pd.DataFrame:
+    """
+    Fetch the 5 most recent records from STREAMLIT_APP_VIEW for display.
+    """
+    recent_df = pd.DataFrame()
+
+    conn = get_snowflake_connection()
+    if conn is None:
+        return recent_df
+
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(RECENT_QUERY)
+        recent_df = cursor.fetch_pandas_all()
+
+    except Exception as e:
+        st.error(f"Error fetching recent records: {str(e)}")
+    finally:
+        if cursor:
+            cursor.close()
+
+    return recent_df
 
 
 def parse_sensitivities_json(value) -> dict:
@@ -205,7 +393,7 @@ def parse_sensitivities_json(value) -> dict:
     Converts numeric values to labels for display.
     Returns dict like {'Margin': 'High'}.
     """
-    if not value or pd.isna(value):
+    if not value:
         return {}
     # Snowflake VARIANT comes through as dict or JSON string
     raw_dict = {}
@@ -231,176 +419,158 @@ def parse_sensitivities_json(value) -> dict:
     return result
 
 
-def get_prefill_data(clients_df: pd.DataFrame, company: str, client_type: str) -> dict:
+@st.cache_resource(ttl=300, hash_funcs={pd.DataFrame: lambda df: df.attrs.get('fetched_at')})
+def build_prefill_index(clients_df: pd.DataFrame) -> dict:
+    """
+    Index client rows by (company, client_type) for constant-time prefill lookups.
+    Cached as a shared resource (not copied per call) - treat the result as read-only.
+    Keyed on the fetch timestamp set by get_clients_df, so the DataFrame is never hashed.
+    """
+    if clients_df.empty:
+        return {}
+    # Keep the first row per key, matching the previous boolean-mask lookup
+    deduped = clients_df.drop_duplicates(subset=['COMPANY', 'CLIENT_TYPE'], keep='first')
+    # Normalise NaN/NaT to None once here so lookups can skip per-field null checks
+    deduped = deduped.astype(object).where(deduped.notna(), None)
+    return dict(zip(zip(deduped['COMPANY'], deduped['CLIENT_TYPE']), deduped.to_dict('records')))
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_prefill_data(company: str, client_type: str, clients_version, _clients_df: pd.DataFrame) -> dict:
     """
     Get prefill data for a specific company and client type combination.
     Returns a dict with field values or empty dict if no match.
+
+    Cached per (company, client_type, clients_version); clients_version is the
+    fetch timestamp of _clients_df, which is not hashed itself.
     """
+    clients_df = _clients_df
     if clients_df.empty or not company or not client_type:
         return {}
 
-    mask = (clients_df['COMPANY'] == company) & (clients_df['CLIENT_TYPE'] == client_type)
-    matched = clients_df[mask]
-
-    if matched.empty:
+    row = build_prefill_index(clients_df).get((company, client_type))
+    if row is None:
         return {}
 
-    row = matched.iloc[0]
     sensitivities_dict = parse_sensitivities_json(row['SENSITIVITIES'])
     barriers_dict = parse_sensitivities_json(row['BARRIERS'])
+    # Null values are already None (see build_prefill_index) and list columns are
+    # pre-split in get_clients_df; copy lists so the shared index is never mutated
     return {
-        'client_status': row['CLIENT_STATUS'] if pd.notna(row['CLIENT_STATUS']) else None,
+        'client_status': row['CLIENT_STATUS'],
         'sensitivities': list(sensitivities_dict.keys()),
         'sensitivities_impact': sensitivities_dict,
         'barriers': list(barriers_dict.keys()),
         'barriers_impact': barriers_dict,
-        'decision_makers': row['DECISION_MAKERS'] if pd.notna(row['DECISION_MAKERS']) else "",
-        'eua_volume': int(float(row['EUA_VOLUME'])) if pd.notna(row['EUA_VOLUME']) else None,
-        'go_volume': int(float(row['GO_VOLUME'])) if pd.notna(row['GO_VOLUME']) else None,
-        'other_product_notes': row['OTHER_PRODUCT_NOTES'] if pd.notna(row['OTHER_PRODUCT_NOTES']) else "",
-        'access_type': row['ACCESS_TYPE'] if pd.notna(row['ACCESS_TYPE']) else None,
-        'front_end': parse_comma_string(row['FRONT_END']),
-        'front_end_details': row['FRONT_END_DETAILS'] if pd.notna(row['FRONT_END_DETAILS']) else "",
-        'clearers': parse_comma_string(row['CLEARERS']),
-        'brokers': parse_comma_string(row['BROKERS']),
-        'etrm': row['ETRM'] if pd.notna(row['ETRM']) else None,
-        'source': row['SOURCE'] if pd.notna(row['SOURCE']) else None,
-        'notes': row['NOTES'] if pd.notna(row['NOTES']) else "",
+        'decision_makers': row['DECISION_MAKERS'] or "",
+        'eua_volume': int(float(row['EUA_VOLUME'])) if row['EUA_VOLUME'] is not None else None,
+        'go_volume': int(float(row['GO_VOLUME'])) if row['GO_VOLUME'] is not None else None,
+        'other_product_notes': row['OTHER_PRODUCT_NOTES'] or "",
+        'access_type': row['ACCESS_TYPE'],
+        'front_end': list(row['FRONT_END']),
+        'front_end_details': row['FRONT_END_DETAILS'] or "",
+        'clearers': list(row['CLEARERS']),
+        'brokers': list(row['BROKERS']),
+        'etrm': row['ETRM'],
+        'source': row['SOURCE'],
+        'notes': row['NOTES'] or "",
     }
 
 
-def insert_client_data(data: dict) -> bool:
+def insert_client_data(rows: list[dict]) -> bool:
     """
-    Insert client data into Snowflake CLIENTS table.
+    Insert client rows into Snowflake CLIENTS table in a single statement.
     UPDATE_ID and DATE are auto-generated by Snowflake.
     """
+    if not rows:
+        return True
+
     conn = get_snowflake_connection()
     if conn is None:
         return False
 
+    query = INSERT_QUERY + "UNION ALL".join([INSERT_ROW_SELECT] * len(rows))
+    params = [row[field] for row in rows for field in INSERT_FIELDS]
+
+    cursor = None
     try:
         cursor = conn.cursor()
-
-        insert_query = """
-        INSERT INTO CLIENTS (
-            CLIENT_STATUS, CLIENT_TYPE, COMPANY, SENSITIVITIES, BARRIERS,
-            DECISION_MAKERS, OVERALL_VOLUME, EUA_VOLUME, GO_VOLUME,
-            POWER_VOLUME, GAS_VOLUME, OTHER_PRODUCT_NOTES, ACCESS_TYPE,
-            FRONT_END, FRONT_END_DETAILS, CLEARERS, BROKERS, ETRM, SOURCE, NOTES
-        )
-        SELECT
-            %(client_status)s, %(client_type)s, %(company)s, PARSE_JSON(%(sensitivities)s), PARSE_JSON(%(barriers)s),
-            %(decision_makers)s, %(overall_volume)s, %(eua_volume)s, %(go_volume)s,
-            %(power_volume)s, %(gas_volume)s, %(other_product_notes)s, %(access_type)s,
-            %(front_end)s, %(front_end_details)s, %(clearers)s, %(brokers)s, %(etrm)s, %(source)s, %(notes)s
-        """
-
-        cursor.execute(insert_query, data)
+        cursor.execute(query, params)
         conn.commit()
-        cursor.close()
-        conn.close()
         return True
 
     except Exception as e:
         st.error(f"Insert error: {str(e)}")
-        if conn:
-            conn.close()
         return False
+    finally:
+        if cursor:
+            cursor.close()
 
 
-def main():
-    st.markdown('<p class="main-header">📊 Client Data Entry Form</p>', unsafe_allow_html=True)
-    st.markdown("Enter client information below to add to the database.")
-
-    st.info("""
-**Required fields:** Company and Client Type (marked with *)
-
-**Note:** Resubmitting for an existing company will update the record. Click **Submit** at the bottom to save.
-""")
+def merge_options(base: tuple, extras: tuple) -> tuple:
+    """Append extras not already in base (e.g. prefilled names missing from a dropdown list)."""
+    if not extras:
+        return base
+    known = set(base)
+    missing = []
+    for extra in extras:
+        if extra and extra not in known:
+            missing.append(extra)
+            known.add(extra)
+    return base + tuple(missing)
+
+
+# Volume range -> midpoint used when no exact volume is entered
+_RANGE_MIDPOINTS = {
+    "<2.5k": 1250,      # midpoint of 0-2500
+    "2.5-5k": 3750,     # midpoint of 2500-5000
+    "5-10k": 7500,      # midpoint of 5000-10000
+    "10-20k": 15000,    # midpoint of 10000-20000
+    "20-50k": 35000,    # midpoint of 20000-50000
+    "50k+": 50000,      # representative value for 50k+
+    "20k+": 20000,      # legacy value for GO volume
+}
 
-    with st.expander("📖 User Guide"):
-        st.markdown("""
-**Getting Started**
-- Select an existing company from the dropdown, or choose "Enter new company" to add a new prospect
-- Choose the Client Type (Customer, Clearer, or Broker) - this is required
-- If a record already exists for the Company + Client Type combination, the form will pre-fill with existing data
 
-**Updating Records**
-- To update an existing record, simply select the same Company and Client Type, make your changes, and submit
-- The new submission will become the current record (previous versions are retained in history)
+def has_changed(prefill: dict, field_name: str, new_value, is_list=False) -> bool:
+    """Compare new value against prefill. Returns True if changed or no prefill exists."""
+    if not prefill:
+        # No prefill = new record, save everything
+        return True
+    prefill_value = prefill.get(field_name)
+    if is_list:
+        # Compare lists (order-independent, duplicates count)
+        prefill_list = prefill_value if prefill_value else []
+        new_list = new_value if new_value else []
+        if len(prefill_list) != len(new_list):
+            return True
+        return tuple(sorted(prefill_list)) != tuple(sorted(new_list))
+    else:
+        # Compare scalar values (treat empty string as None)
+        if prefill_value == "" or prefill_value is None:
+            prefill_value = None
+        if new_value == "" or new_value is None:
+            new_value = None
+        return prefill_value != new_value
 
-**Volume Information**
-- You can enter volumes as an estimated range OR an exact number
-- If you enter both, the exact number takes priority
 
-**Service Providers**
-- Select clearers and brokers from the dropdown lists
-- If a clearer or broker isn't in the list, check "Add new" and type the name(s) comma-separated
+def _nz(value):
+    """Empty values (None, "", 0, []) are saved as None."""
+    return value or None
 
-**Refresh Data**
-- After submitting, your new entry won't appear in dropdowns immediately (data is cached for performance)
-- Click "Refresh Data" below the Submit button to reload the latest data from the database
-""")
 
-    st.markdown("<hr style='border: 2px solid #ccc; margin: 2rem 0;'>", unsafe_allow_html=True)
+def _join(values):
+    """List fields are saved as a ', '-joined string, or None when empty."""
+    return ", ".join(values) if values else None
 
-    # Initialize session state for company fields
-    if 'company_selection' not in st.session_state:
-        st.session_state.company_selection = "Select a company..."
-    if 'new_company_name' not in st.session_state:
-        st.session_state.new_company_name = ""
-    if 'client_type_selection' not in st.session_state:
-        st.session_state.client_type_selection = None
-
-    # Initialize session state for clearers/brokers fields
-    if 'clearers' not in st.session_state:
-        st.session_state.clearers = []
-    if 'add_new_clearer' not in st.session_state:
-        st.session_state.add_new_clearer = False
-    if 'additional_clearers' not in st.session_state:
-        st.session_state.additional_clearers = ""
-    if 'brokers' not in st.session_state:
-        st.session_state.brokers = []
-    if 'add_new_broker' not in st.session_state:
-        st.session_state.add_new_broker = False
-    if 'additional_brokers' not in st.session_state:
-        st.session_state.additional_brokers = ""
-
-    # Check if we need to reset fields (set by successful form submission)
-    if st.session_state.get('reset_company_fields', False):
-        st.session_state.company_selection = "Select a company..."
-        st.session_state.new_company_name = ""
-        st.session_state.client_type_selection = None
-        st.session_state.clearers = []
-        st.session_state.add_new_clearer = False
-        st.session_state.additional_clearers = ""
-        st.session_state.brokers = []
-        st.session_state.add_new_broker = False
-        st.session_state.additional_brokers = ""
-        st.session_state.go_volume_range = None
-        st.session_state.go_volume_exact = None
-        st.session_state.previous_selection = None
-        # Reset sensitivities
-        for sens in ["Margin", "Fees", "Liquidity", "Settlement"]:
-            st.session_state[f"sens_{sens}"] = False
-            if f"sens_impact_{sens}" in st.session_state:
-                del st.session_state[f"sens_impact_{sens}"]
-        # Reset barriers
-        for blk in ["Habit (e.g. ICE Default)", "Systems Setup (EEX)", "Systems Setup (Client or External)", "Compliance", "Risk", "Onboarding/KYC", "Execution speed"]:
-            st.session_state[f"blk_{blk}"] = False
-            if f"blk_impact_{blk}" in st.session_state:
-                del st.session_state[f"blk_impact_{blk}"]
-        st.session_state.reset_company_fields = False
-
-    # Show success message and balloons after rerun
-    if st.session_state.get('show_success', False):
-        st.success("Client data submitted successfully!")
-        st.balloons()
-        st.session_state.show_success = False
-
-    # Fetch all data using single connection
-    company_list, broker_list, clearer_list, clients_df, recent_df = get_all_data()
 
+@st.fragment
+def render_form(company_list: tuple, broker_list: tuple, clearer_list: tuple, clients_df: pd.DataFrame):
+    """
+    Render the data entry form (company selection through submit).
+    Runs as a fragment so widget changes rerun only this block, not the whole page;
+    a successful submit still calls st.rerun() for a full-app rerun.
+    """
     # Required Info section in bordered container
     with st.container(border=True):
         st.markdown("**Required Info**")
@@ -408,7 +578,7 @@ def main():
         # Company selection outside form for dynamic behavior
         company_selection = st.selectbox(
             "Company *",
-            options=["Select a company...", "-- Enter new company --"] + company_list,
+            options=("Select a company...", "-- Enter new company --") + company_list,
             index=0,
             key="company_selection",
             help="Select from list or choose 'Enter new company' to add a new prospect"
@@ -428,7 +598,7 @@ def main():
         # Client Type selection outside form for dynamic prefill
         client_type = st.selectbox(
             "Client Type *",
-            options=["Customer", "Clearer", "Broker"],
+            options=CLIENT_TYPE_OPTIONS,
             index=None,
             placeholder="Select client type...",
             key="client_type_selection",
@@ -436,7 +606,7 @@ def main():
         )
 
     # Get prefill data based on Company + Client Type selection
-    prefill = get_prefill_data(clients_df, company, client_type)
+    prefill = get_prefill_data(company, client_type, clients_df.attrs.get('fetched_at'), clients_df)
 
     # Track current selection to detect changes
     current_selection = f"{company}|{client_type}"
@@ -453,14 +623,14 @@ def main():
             # Update sensitivities checkboxes and impact dropdowns
             prefill_sens = prefill.get('sensitivities', [])
             prefill_impact = prefill.get('sensitivities_impact', {})
-            for sens in ["Margin", "Fees", "Liquidity", "Settlement"]:
+            for sens in SENSITIVITY_OPTIONS:
                 st.session_state[f"sens_{sens}"] = sens in prefill_sens
                 if sens in prefill_impact:
                     st.session_state[f"sens_impact_{sens}"] = prefill_impact[sens]
             # Update barriers checkboxes and impact dropdowns
             prefill_blk = prefill.get('barriers', [])
             prefill_blk_impact = prefill.get('barriers_impact', {})
-            for blk in ["Habit (e.g. ICE Default)", "Systems Setup (EEX)", "Systems Setup (Client or External)", "Compliance", "Risk", "Onboarding/KYC", "Execution speed"]:
+            for blk in BARRIER_OPTIONS:
                 st.session_state[f"blk_{blk}"] = blk in prefill_blk
                 if blk in prefill_blk_impact:
                     st.session_state[f"blk_impact_{blk}"] = prefill_blk_impact[blk]
@@ -471,12 +641,12 @@ def main():
             st.session_state.go_volume_range = None
             st.session_state.go_volume_exact = None
             # Clear sensitivities
-            for sens in ["Margin", "Fees", "Liquidity", "Settlement"]:
+            for sens in SENSITIVITY_OPTIONS:
                 st.session_state[f"sens_{sens}"] = False
                 if f"sens_impact_{sens}" in st.session_state:
                     del st.session_state[f"sens_impact_{sens}"]
             # Clear barriers
-            for blk in ["Habit (e.g. ICE Default)", "Systems Setup (EEX)", "Systems Setup (Client or External)", "Compliance", "Risk", "Onboarding/KYC", "Execution speed"]:
+            for blk in BARRIER_OPTIONS:
                 st.session_state[f"blk_{blk}"] = False
                 if f"blk_impact_{blk}" in st.session_state:
                     del st.session_state[f"blk_impact_{blk}"]
@@ -485,15 +655,8 @@ def main():
     st.markdown('<p class="sub-header">Service Providers</p>', unsafe_allow_html=True)
 
     # Extend dropdown options with any prefilled values not already in the list
-    clearer_options = list(clearer_list)
-    for c in prefill.get('clearers', []):
-        if c and c not in clearer_options:
-            clearer_options.append(c)
-
-    broker_options = list(broker_list)
-    for b in prefill.get('brokers', []):
-        if b and b not in broker_options:
-            broker_options.append(b)
+    clearer_options = merge_options(clearer_list, tuple(prefill.get('clearers', [])))
+    broker_options = merge_options(broker_list, tuple(prefill.get('brokers', [])))
 
     col1, col2 = st.columns(2)
 
@@ -536,14 +699,12 @@ def main():
     # Sensitivities section - outside form for dynamic behavior
     st.markdown('<p class="sub-header">Trading Information</p>', unsafe_allow_html=True)
 
-    sensitivities_options = ["Margin", "Fees", "Liquidity", "Settlement"]
-
     with st.container(border=True):
         st.markdown("**Sensitivities**")
         st.caption("Key issues that direct flow - select qualification level for each")
 
         sensitivities_with_impact = {}
-        for sens in sensitivities_options:
+        for sens in SENSITIVITY_OPTIONS:
             sens_col1, sens_col2 = st.columns([1, 2])
             with sens_col1:
                 # Initialize session state if not exists
@@ -564,22 +725,13 @@ def main():
                     sensitivities_with_impact[sens] = impact
 
     # Barriers section - outside form for dynamic behavior (matches sensitivities pattern)
-    barriers_options = [
-        "Habit (e.g. ICE Default)",
-        "Systems Setup (EEX)",
-        "Systems Setup (Client or External)",
-        "Compliance",
-        "Risk",
-        "Onboarding/KYC",
-        "Execution speed",
-    ]
 
     with st.container(border=True):
         st.markdown("**Barriers**")
         st.caption("Barriers to trading - select qualification level for each")
 
         barriers_with_impact = {}
-        for blk in barriers_options:
+        for blk in BARRIER_OPTIONS:
             blk_col1, blk_col2 = st.columns([1, 2])
             with blk_col1:
                 if f"blk_{blk}" not in st.session_state:
@@ -601,13 +753,12 @@ def main():
     with st.form("client_form", clear_on_submit=True):
 
         # Client Status - with prefill
-        status_options = ["Client", "Prospect", "Setting up"]
         status_index = None
-        if prefill.get('client_status') in status_options:
-            status_index = status_options.index(prefill['client_status'])
+        if prefill.get('client_status') in STATUS_OPTIONS:
+            status_index = STATUS_OPTIONS.index(prefill['client_status'])
         client_status = st.selectbox(
             "Client Status",
-            options=status_options,
+            options=STATUS_OPTIONS,
             index=status_index,
             placeholder="Select status...",
             help="Current status of the client"
@@ -630,7 +781,7 @@ def main():
         with eua_col1:
             eua_volume_range = st.selectbox(
                 "Estimated Range",
-                options=[None, "<2.5k", "2.5-5k", "5-10k", "10-20k", "20-50k", "50k+"],
+                options=EUA_VOLUME_RANGES,
                 index=0,
                 format_func=lambda x: "Select range..." if x is None else x,
                 help="Select an estimated volume range"
@@ -649,7 +800,7 @@ def main():
         with go_col1:
             go_volume_range = st.selectbox(
                 "Estimated Range",
-                options=[None, "<2.5k", "2.5-5k", "5-10k", "10-20k", "20k+"],
+                options=GO_VOLUME_RANGES,
                 format_func=lambda x: "Select range..." if x is None else x,
                 help="Select an estimated volume range",
                 key="go_volume_range"
@@ -676,45 +827,24 @@ def main():
         col1, col2 = st.columns(2)
 
         with col1:
-            access_options = ["NCM", "GCM", "DMA", "API", "Sponsored Access", "Voice", "Other"]
             access_index = None
-            if prefill.get('access_type') in access_options:
-                access_index = access_options.index(prefill['access_type'])
+            if prefill.get('access_type') in ACCESS_TYPE_OPTIONS:
+                access_index = ACCESS_TYPE_OPTIONS.index(prefill['access_type'])
             access_type = st.selectbox(
                 "Access Type",
-                options=access_options,
+                options=ACCESS_TYPE_OPTIONS,
                 index=access_index,
                 placeholder="e.g. NCM",
                 help="Type of market access"
             )
 
         with col2:
-            etrm_options = [
-                "Allegro",
-                "Amphora",
-                "Aspect",
-                "Brady (Igloo, Powerdesk, Crisk...)",
-                "Comcore",
-                "Eka",
-                "Endure",
-                "Entrade",
-                "Entrader",
-                "Ignite",
-                "Inatech",
-                "Lancelot",
-                "Molecule",
-                "Openlink",
-                "PCI",
-                "PexaOS",
-                "Triplepoint",
-                "Vuepoint"
-            ]
             etrm_index = None
-            if prefill.get('etrm') in etrm_options:
-                etrm_index = etrm_options.index(prefill['etrm'])
+            if prefill.get('etrm') in ETRM_OPTIONS:
+                etrm_index = ETRM_OPTIONS.index(prefill['etrm'])
             etrm = st.selectbox(
                 "ETRM",
-                options=etrm_options,
+                options=ETRM_OPTIONS,
                 index=etrm_index,
                 placeholder="Select ETRM system",
                 help="Energy Trading Risk Management system"
@@ -725,11 +855,10 @@ def main():
         col1, col2 = st.columns(2)
 
         with col1:
-            front_end_options = ["TT", "Trayport", "Touchpoint", "Manual Entry", "CQG"]
             front_end = st.multiselect(
                 "Front End",
-                options=front_end_options,
-                default=[f for f in prefill.get('front_end', []) if f in front_end_options],
+                options=FRONT_END_OPTIONS,
+                default=[f for f in prefill.get('front_end', []) if f in FRONT_END_OPTIONS],
                 help="Trading front-end systems (select multiple)"
             )
 
@@ -742,13 +871,12 @@ def main():
             )
 
         # Source - with prefill
-        source_options = ["Meeting", "Estimate", "Call"]
         source_index = None
-        if prefill.get('source') in source_options:
-            source_index = source_options.index(prefill['source'])
+        if prefill.get('source') in SOURCE_OPTIONS:
+            source_index = SOURCE_OPTIONS.index(prefill['source'])
         source = st.selectbox(
             "Source",
-            options=source_options,
+            options=SOURCE_OPTIONS,
             index=source_index,
             placeholder="e.g. Meeting",
             help="Data source"
@@ -774,31 +902,15 @@ def main():
             elif not company or company == "Select a company..." or company == "-- Enter new company --":
                 st.error("Company name is required!")
             else:
-                # Convert multi-select lists to comma-separated strings
-                front_end_str = ", ".join(front_end) if front_end else None
-
                 # Combine selected clearers with additional ones
-                all_clearers = list(clearers) if clearers else []
+                all_clearers = list(clearers or ())
                 if additional_clearers:
                     all_clearers.extend([c.strip() for c in additional_clearers.split(",") if c.strip()])
-                clearers_str = ", ".join(all_clearers) if all_clearers else None
 
                 # Combine selected brokers with additional ones
-                all_brokers = list(brokers) if brokers else []
+                all_brokers = list(brokers or ())
                 if additional_brokers:
                     all_brokers.extend([b.strip() for b in additional_brokers.split(",") if b.strip()])
-                brokers_str = ", ".join(all_brokers) if all_brokers else None
-
-                # Range to midpoint mapping
-                range_midpoints = {
-                    "<2.5k": 1250,      # midpoint of 0-2500
-                    "2.5-5k": 3750,     # midpoint of 2500-5000
-                    "5-10k": 7500,      # midpoint of 5000-10000
-                    "10-20k": 15000,    # midpoint of 10000-20000
-                    "20-50k": 35000,    # midpoint of 20000-50000
-                    "50k+": 50000,      # representative value for 50k+
-                    "20k+": 20000,      # legacy value for GO volume
-                }
 
                 # Process EUA volume - exact value takes priority, otherwise use range midpoint
                 eua_volume = None
@@ -807,7 +919,7 @@ def main():
                     if eua_volume_range is not None:
                         st.info("Note: Using exact EUA volume value (range selection ignored)")
                 elif eua_volume_range is not None:
-                    eua_volume = range_midpoints.get(eua_volume_range)
+                    eua_volume = _RANGE_MIDPOINTS.get(eua_volume_range)
 
                 # Process GO volume - exact value takes priority, otherwise use range midpoint
                 go_volume = None
@@ -816,7 +928,7 @@ def main():
                     if go_volume_range is not None:
                         st.info("Note: Using exact GO volume value (range selection ignored)")
                 elif go_volume_range is not None:
-                    go_volume = range_midpoints.get(go_volume_range)
+                    go_volume = _RANGE_MIDPOINTS.get(go_volume_range)
 
                 # Convert sensitivities with impact levels to JSON string for VARIANT column
                 # Store numeric values: {"Margin": 0.75, "Fees": 0.5}
@@ -835,68 +947,178 @@ def main():
                 barriers_json = json.dumps(barriers_numeric) if barriers_numeric else None
                 barriers = list(barriers_with_impact.keys())  # For has_changed comparison
 
-                # Helper function to check if a value has changed from prefill
-                def has_changed(field_name, new_value, is_list=False):
-                    """Compare new value against prefill. Returns True if changed or no prefill exists."""
-                    if not prefill:
-                        # No prefill = new record, save everything
-                        return True
-                    prefill_value = prefill.get(field_name)
-                    if is_list:
-                        # Compare lists (order-independent)
-                        prefill_list = prefill_value if prefill_value else []
-                        new_list = new_value if new_value else []
-                        return set(prefill_list) != set(new_list)
-                    else:
-                        # Compare scalar values (treat empty string as None)
-                        if prefill_value == "" or prefill_value is None:
-                            prefill_value = None
-                        if new_value == "" or new_value is None:
-                            new_value = None
-                        return prefill_value != new_value
-
                 # Prepare data - only include changed fields (always include company and client_type)
+                scalars = {
+                    'client_status': client_status,
+                    'decision_makers': decision_makers,
+                    'eua_volume': eua_volume,
+                    'go_volume': go_volume,
+                    'other_product_notes': other_product_notes,
+                    'access_type': access_type,
+                    'front_end_details': front_end_details,
+                    'etrm': etrm,
+                    'source': source,
+                    'notes': notes,
+                }
+                lists = {
+                    'front_end': front_end,
+                    'clearers': all_clearers,
+                    'brokers': all_brokers,
+                }
                 data = {
-                    'client_status': (client_status if client_status else None) if has_changed('client_status', client_status) else None,
                     'client_type': client_type,  # Always save
                     'company': company,  # Always save
-                    'sensitivities': sensitivities_json if has_changed('sensitivities', sensitivities, is_list=True) else None,
-                    'barriers': barriers_json if has_changed('barriers', barriers, is_list=True) else None,
-                    'decision_makers': (decision_makers if decision_makers else None) if has_changed('decision_makers', decision_makers) else None,
                     'overall_volume': None,
-                    'eua_volume': eua_volume if has_changed('eua_volume', eua_volume) else None,
-                    'go_volume': go_volume if has_changed('go_volume', go_volume) else None,
                     'power_volume': None,
                     'gas_volume': None,
-                    'other_product_notes': (other_product_notes if other_product_notes else None) if has_changed('other_product_notes', other_product_notes) else None,
-                    'access_type': (access_type if access_type else None) if has_changed('access_type', access_type) else None,
-                    'front_end': front_end_str if has_changed('front_end', front_end, is_list=True) else None,
-                    'front_end_details': (front_end_details if front_end_details else None) if has_changed('front_end_details', front_end_details) else None,
-                    'clearers': clearers_str if has_changed('clearers', all_clearers, is_list=True) else None,
-                    'brokers': brokers_str if has_changed('brokers', all_brokers, is_list=True) else None,
-                    'etrm': (etrm if etrm else None) if has_changed('etrm', etrm) else None,
-                    'source': (source if source else None) if has_changed('source', source) else None,
-                    'notes': (notes if notes else None) if has_changed('notes', notes) else None
+                    # Impact dicts are compared by their keys but saved as JSON
+                    'sensitivities': sensitivities_json if has_changed(prefill, 'sensitivities', sensitivities, is_list=True) else None,
+                    'barriers': barriers_json if has_changed(prefill, 'barriers', barriers, is_list=True) else None,
                 }
+                data.update({
+                    field: _nz(value) if has_changed(prefill, field, value) else None
+                    for field, value in scalars.items()
+                })
+                data.update({
+                    field: _join(values) if has_changed(prefill, field, values, is_list=True) else None
+                    for field, values in lists.items()
+                })
+
+                # Existing record with nothing changed - skip the round-trip to Snowflake
+                unchanged = prefill and all(
+                    value is None for field, value in data.items()
+                    if field not in ('client_type', 'company')
+                )
+
+                if unchanged:
+                    st.info("No changes to save.")
+                else:
+                    # Insert data
+                    with st.spinner("Submitting data..."):
+                        success = insert_client_data([data])
+
+                    if success:
+                        # Only invalidate what this insert changed: client rows and recent records.
+                        # New firm names are added to the cached dropdown lists in place.
+                        get_clients_df.clear()
+                        get_recent_df.clear()
+                        add_firm_names(brokers=all_brokers, clearers=all_clearers, companies=[company])
+                        # Flag to reset company fields and show success on next rerun
+                        st.session_state.reset_company_fields = True
+                        st.session_state.show_success = True
+                        st.rerun()
+                    else:
+                        st.error("Failed to submit data. Please check your connection and try again.")
 
-                # Insert data
-                with st.spinner("Submitting data..."):
-                    success = insert_client_data(data)
 
-                if success:
-                    # Flag to reset company fields and show success on next rerun
-                    st.session_state.reset_company_fields = True
-                    st.session_state.show_success = True
-                    st.rerun()
-                else:
-                    st.error("Failed to submit data. Please check your connection and try again.")
+def main():
+    st.markdown('<p class="main-header">📊 Client Data Entry Form</p>', unsafe_allow_html=True)
+    st.markdown("Enter client information below to add to the database.")
+
+    st.info("""
+**Required fields:** Company and Client Type (marked with *)
+
+**Note:** Resubmitting for an existing company will update the record. Click **Submit** at the bottom to save.
+""")
+
+    with st.expander("📖 User Guide"):
+        st.markdown("""
+**Getting Started**
+- Select an existing company from the dropdown, or choose "Enter new company" to add a new prospect
+- Choose the Client Type (Customer, Clearer, or Broker) - this is required
+- If a record already exists for the Company + Client Type combination, the form will pre-fill with existing data
+
+**Updating Records**
+- To update an existing record, simply select the same Company and Client Type, make your changes, and submit
+- The new submission will become the current record (previous versions are retained in history)
+
+**Volume Information**
+- You can enter volumes as an estimated range OR an exact number
+- If you enter both, the exact number takes priority
+
+**Service Providers**
+- Select clearers and brokers from the dropdown lists
+- If a clearer or broker isn't in the list, check "Add new" and type the name(s) comma-separated
+
+**Refresh Data**
+- New companies, clearers and brokers you submit are added to the dropdowns straight away
+- Entries made by other users may not appear immediately (data is cached for performance)
+- Click "Refresh Data" below the Submit button to reload the latest data from the database
+""")
+
+    st.markdown("<hr style='border: 2px solid #ccc; margin: 2rem 0;'>", unsafe_allow_html=True)
+
+    # Initialize session state for company fields
+    if 'company_selection' not in st.session_state:
+        st.session_state.company_selection = "Select a company..."
+    if 'new_company_name' not in st.session_state:
+        st.session_state.new_company_name = ""
+    if 'client_type_selection' not in st.session_state:
+        st.session_state.client_type_selection = None
+
+    # Initialize session state for clearers/brokers fields
+    if 'clearers' not in st.session_state:
+        st.session_state.clearers = []
+    if 'add_new_clearer' not in st.session_state:
+        st.session_state.add_new_clearer = False
+    if 'additional_clearers' not in st.session_state:
+        st.session_state.additional_clearers = ""
+    if 'brokers' not in st.session_state:
+        st.session_state.brokers = []
+    if 'add_new_broker' not in st.session_state:
+        st.session_state.add_new_broker = False
+    if 'additional_brokers' not in st.session_state:
+        st.session_state.additional_brokers = ""
+
+    # Check if we need to reset fields (set by successful form submission)
+    if st.session_state.get('reset_company_fields', False):
+        st.session_state.company_selection = "Select a company..."
+        st.session_state.new_company_name = ""
+        st.session_state.client_type_selection = None
+        st.session_state.clearers = []
+        st.session_state.add_new_clearer = False
+        st.session_state.additional_clearers = ""
+        st.session_state.brokers = []
+        st.session_state.add_new_broker = False
+        st.session_state.additional_brokers = ""
+        st.session_state.go_volume_range = None
+        st.session_state.go_volume_exact = None
+        st.session_state.previous_selection = None
+        # Reset sensitivities
+        for sens in SENSITIVITY_OPTIONS:
+            st.session_state[f"sens_{sens}"] = False
+            if f"sens_impact_{sens}" in st.session_state:
+                del st.session_state[f"sens_impact_{sens}"]
+        # Reset barriers
+        for blk in BARRIER_OPTIONS:
+            st.session_state[f"blk_{blk}"] = False
+            if f"blk_impact_{blk}" in st.session_state:
+                del st.session_state[f"blk_impact_{blk}"]
+        st.session_state.reset_company_fields = False
+
+    # Confirm the submit after the rerun; a toast overlays the page instead of
+    # pushing the form down like an inline st.success block
+    if st.session_state.get('show_success', False):
+        st.toast("Client data submitted successfully!", icon="✅")
+        st.balloons()
+        st.session_state.show_success = False
+
+    # Fetch dropdown lists and client data (each cached with its own TTL)
+    broker_list, clearer_list, company_list = get_firm_names()
+    clients_df = get_clients_df()
+    recent_df = get_recent_df()
+
+    # Company selection through the submit button; interactions here rerun only the fragment
+    render_form(company_list, broker_list, clearer_list, clients_df)
 
     # Refresh Data button (outside form)
     st.markdown("")
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         if st.button("🔄 Refresh Data", help="Refresh dropdown lists to see newly added entries", use_container_width=True):
-            get_all_data.clear()
+            get_firm_names.clear()
+            get_clients_df.clear()
+            get_recent_df.clear()
             st.rerun()
 
     # Display 5 most recent records